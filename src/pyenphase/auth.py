@@ -1,13 +1,22 @@
 """Envoy authentication methods."""
 
+import base64
+import contextlib
 import ssl
-from abc import abstractmethod, abstractproperty
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from types import MappingProxyType, TracebackType
 from typing import Any, cast
 
 import httpx
-import jwt
 import orjson
-from tenacity import retry, retry_if_exception_type, wait_random_exponential
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
 
 from .exceptions import EnvoyAuthenticationError
 
@@ -17,30 +26,126 @@ def create_default_ssl_context() -> ssl.SSLContext:
     return ssl.create_default_context()
 
 
-_SSL_CONTEXT = create_default_ssl_context()
+_SSL_CONTEXT: ssl.SSLContext | None = None
 
 
-class EnvoyAuth:
+def _get_ssl_context() -> ssl.SSLContext:
+    """Return the default SSL context, creating it on first use.
+
+    Building an SSLContext loads the system trust store, which is
+    expensive, so defer it until the cloud token flow actually needs it.
+    """
+    global _SSL_CONTEXT
+    if _SSL_CONTEXT is None:
+        _SSL_CONTEXT = create_default_ssl_context()
+    return _SSL_CONTEXT
+
+
+# How long an Enlighten session ID is assumed to stay usable; sessions
+# last longer server side, but stay conservative
+SESSION_ID_TTL = 3600
+
+# Shared singletons so hot request paths do not allocate a fresh empty
+# object per call; the cookies one is an httpx.Cookies to match the
+# types httpx accepts for its cookies argument
+_EMPTY_HEADERS: Mapping[str, str] = MappingProxyType({})
+_EMPTY_COOKIES = httpx.Cookies()
+
+_CLOUD_CLIENT: httpx.AsyncClient | None = None
+
+
+def _get_cloud_client() -> httpx.AsyncClient:
+    """Return the shared client for the Enphase cloud, creating it on first use.
+
+    Sharing one client keeps the connection pool (and TLS sessions) to
+    the Enlighten and entrez endpoints alive across token refreshes.
+    """
+    global _CLOUD_CLIENT
+    if _CLOUD_CLIENT is None:
+        try:
+            # HTTP/2 lets the token POST multiplex onto the connection
+            # opened by the login POST, saving a round trip; it needs
+            # the optional h2 package (httpx[http2])
+            _CLOUD_CLIENT = httpx.AsyncClient(
+                verify=_get_ssl_context(), timeout=10, follow_redirects=True, http2=True
+            )
+        except ImportError:
+            _CLOUD_CLIENT = httpx.AsyncClient(
+                verify=_get_ssl_context(), timeout=10, follow_redirects=True
+            )
+    return _CLOUD_CLIENT
+
+
+@retry(
+    retry=retry_if_exception_type(
+        (httpx.NetworkError, httpx.TimeoutException, httpx.RemoteProtocolError)
+    ),
+    wait=wait_exponential_jitter(initial=1, max=30, jitter=0.5),
+    stop=stop_after_attempt(3),
+    reraise=True,
+)
+async def _post_json(
+    cloud_client: httpx.AsyncClient,
+    url: str,
+    data: dict[str, Any] | None = None,
+    json: dict[str, Any] | None = None,
+) -> httpx.Response:
+    """Post to the Enphase cloud with the shared cloud client."""
+    return await cloud_client.post(url, json=json, data=data)
+
+
+def _extract_exp(token: str) -> int:
+    """Extract the exp claim from a JWT without verifying it.
+
+    Much cheaper than a full jwt.decode since it skips header parsing
+    and algorithm dispatch to pull out the single field we need.
+    """
+    payload_b64 = token.split(".", 2)[1]
+    padding = "=" * (-len(payload_b64) % 4)
+    payload = orjson.loads(base64.urlsafe_b64decode(payload_b64 + padding))
+    return cast(int, payload["exp"])
+
+
+class EnvoyAuth(ABC):
     """Base class for Envoy authentication."""
 
+    __slots__ = ()
+
     def __init__(self, host: str) -> None:
         """Initialize the EnvoyAuth class."""
         pass
 
+    async def __aenter__(self) -> "EnvoyAuth":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Release any network resources held for authentication."""
+
     @abstractmethod
     async def setup(self, client: httpx.AsyncClient) -> None:
         """Obtain the token for Envoy authentication."""
 
-    @abstractproperty
-    def cookies(self) -> dict[str, str]:
+    @property
+    @abstractmethod
+    def cookies(self) -> dict[str, str] | httpx.Cookies:
         """Return the Envoy cookie."""
 
-    @abstractproperty
+    @property
+    @abstractmethod
     def auth(self) -> httpx.DigestAuth | None:
         """Return the httpx auth object."""
 
-    @abstractproperty
-    def headers(self) -> dict[str, str]:
+    @property
+    @abstractmethod
+    def headers(self) -> Mapping[str, str]:
         """Return the auth headers."""
 
     @abstractmethod
@@ -52,6 +157,24 @@ class EnvoyTokenAuth(EnvoyAuth):
     JSON_LOGIN_URL = "https://enlighten.enphaseenergy.com/login/login.json?"
     TOKEN_URL = "https://entrez.enphaseenergy.com/tokens"  # nosec
 
+    __slots__ = (
+        "host",
+        "cloud_username",
+        "cloud_password",
+        "envoy_serial",
+        "_token",
+        "_cookies",
+        "_manager_token",
+        "_is_consumer",
+        "_token_exp",
+        "_token_exp_for",
+        "_headers",
+        "_headers_for_token",
+        "_url_prefix",
+        "_session_id",
+        "_session_id_exp",
+    )
+
     def __init__(
         self,
         host: str,
@@ -59,17 +182,28 @@ class EnvoyTokenAuth(EnvoyAuth):
         cloud_password: str | None = None,
         envoy_serial: str | None = None,
         token: str | None = None,
+        cookies: dict[str, str] | None = None,
     ) -> None:
         self.host = host
         self.cloud_username = cloud_username
         self.cloud_password = cloud_password
         self.envoy_serial = envoy_serial
         self._token = token
+        self._cookies: dict[str, str] | httpx.Cookies | None = cookies
+        self._manager_token: str | None = None
+        self._token_exp: int | None = None
+        self._token_exp_for: str | None = None
+        self._headers: dict[str, str] = {}
+        self._headers_for_token: str | None = None
+        self._url_prefix = f"https://{host}"
+        self._session_id: str | None = None
+        self._session_id_exp: float | None = None
 
     async def setup(self, client: httpx.AsyncClient) -> None:
         """Obtain the token for Envoy authentication."""
         if not self._token:
             self._token = await self._obtain_token()
+            self._token_exp_for = None
 
         # Verify we have adequate credentials
         if not self._token:
@@ -77,6 +211,13 @@ class EnvoyTokenAuth(EnvoyAuth):
                 "Unable to obtain token for Envoy authentication."
             )
 
+        # If the caller supplied cookies from an earlier session and the
+        # token is not about to expire, skip the verification round-trip
+        if self._cookies:
+            with contextlib.suppress(Exception):
+                if _extract_exp(self._token) - time.time() > 60:
+                    return
+
         # Verify the token and obtain cookie with session ID necessary for some API calls
         req = await client.get(
             f"https://{self.host}/auth/check_jwt",
@@ -90,7 +231,39 @@ class EnvoyTokenAuth(EnvoyAuth):
 
         self._cookies = req.cookies
 
-    async def _obtain_token(self) -> None:
+    async def _login_enlighten(self, cloud_client: httpx.AsyncClient) -> str:
+        """Login to Enlighten and return a session ID."""
+        response = await _post_json(
+            cloud_client,
+            self.JSON_LOGIN_URL,
+            data={
+                "user[email]": self.cloud_username,
+                "user[password]": self.cloud_password,
+            },
+        )
+        if response.status_code != 200:
+            raise EnvoyAuthenticationError(
+                "Unable to login to Enlighten to obtain session ID from "
+                f"{self.JSON_LOGIN_URL}: "
+                f"{response.status_code}: {response.text}"
+            )
+        try:
+            # orjson accepts bytes; skip the charset-detecting str decode
+            login_data = orjson.loads(response.content)
+        except orjson.JSONDecodeError as err:
+            raise EnvoyAuthenticationError(
+                "Unable to decode response from Enlighten: "
+                f"{response.status_code}: {response.text}"
+            ) from err
+
+        self._is_consumer = login_data["is_consumer"]
+        self._manager_token = login_data["manager_token"]
+        session_id: str = login_data["session_id"]
+        self._session_id = session_id
+        self._session_id_exp = time.time() + SESSION_ID_TTL
+        return session_id
+
+    async def _obtain_token(self) -> str:
         """Obtain the token for Envoy authentication."""
         # Raise if we don't have cloud credentials
         if not self.cloud_username or not self.cloud_password:
@@ -104,93 +277,110 @@ class EnvoyTokenAuth(EnvoyAuth):
                 "Your firmware requires token authentication, "
                 "but no envoy serial number was provided to obtain the token."
             )
-        # We require a new client that checks SSL certs
-        async with httpx.AsyncClient(
-            verify=_SSL_CONTEXT, timeout=10, follow_redirects=True
-        ) as cloud_client:
-            # Login to Enlighten to obtain a session ID
-            response = await self._post_json_with_cloud_client(
-                cloud_client,
-                self.JSON_LOGIN_URL,
-                data={
-                    "user[email]": self.cloud_username,
-                    "user[password]": self.cloud_password,
-                },
-            )
-            if response.status_code != 200:
-                raise EnvoyAuthenticationError(
-                    "Unable to login to Enlighten to obtain session ID from "
-                    f"{self.JSON_LOGIN_URL}: "
-                    f"{response.status_code}: {response.text}"
-                )
-            try:
-                response = orjson.loads(response.text)
-            except orjson.JSONDecodeError as err:
-                raise EnvoyAuthenticationError(
-                    "Unable to decode response from Enlighten: "
-                    f"{response.status_code}: {response.text}"
-                ) from err
-
-            self._is_consumer = response["is_consumer"]
-            self._manager_token = response["manager_token"]
-
-            # Obtain the token
-            response = await self._post_json_with_cloud_client(
+        # We require a client that checks SSL certs; reuse the shared one
+        # so consecutive refreshes keep the connections to the cloud alive
+        cloud_client = _get_cloud_client()
+        # Reuse the Enlighten session while it is still fresh to skip the
+        # login round-trip
+        used_cached_session = False
+        if (
+            self._session_id
+            and self._session_id_exp
+            and time.time() < self._session_id_exp - 60
+        ):
+            session_id = self._session_id
+            used_cached_session = True
+        else:
+            session_id = await self._login_enlighten(cloud_client)
+
+        # Obtain the token
+        response = await _post_json(
+            cloud_client,
+            self.TOKEN_URL,
+            json={
+                "session_id": session_id,
+                "serial_num": self.envoy_serial,
+                "username": self.cloud_username,
+            },
+        )
+        if response.status_code == 401 and used_cached_session:
+            # The cached session was invalidated server side;
+            # login again and retry once
+            self._session_id = None
+            session_id = await self._login_enlighten(cloud_client)
+            response = await _post_json(
                 cloud_client,
                 self.TOKEN_URL,
                 json={
-                    "session_id": response["session_id"],
+                    "session_id": session_id,
                     "serial_num": self.envoy_serial,
                     "username": self.cloud_username,
                 },
             )
-            if response.status_code != 200:
-                raise EnvoyAuthenticationError(
-                    "Unable to obtain token for Envoy authentication from "
-                    f"{self.TOKEN_URL}: "
-                    f"{response.status_code}: {response.text}"
-                )
-            return response.text
-
-    async def refresh(self) -> None:
-        """Refresh the token for Envoy authentication."""
+        if response.status_code != 200:
+            raise EnvoyAuthenticationError(
+                "Unable to obtain token for Envoy authentication from "
+                f"{self.TOKEN_URL}: "
+                f"{response.status_code}: {response.text}"
+            )
+        return response.text
+
+    @classmethod
+    async def aclose_cloud_client(cls) -> None:
+        """Close the shared cloud client during library teardown.
+
+        This tears down the connection pool used by every
+        EnvoyTokenAuth instance, so only call it when no token refresh
+        is in flight. The next refresh transparently creates a new one.
+        """
+        global _CLOUD_CLIENT
+        if _CLOUD_CLIENT is not None:
+            client = _CLOUD_CLIENT
+            _CLOUD_CLIENT = None
+            await client.aclose()
+
+    async def refresh(self, *, force: bool = False, min_ttl: int = 3600) -> None:
+        """Refresh the token for Envoy authentication.
+
+        The full cloud round-trip is skipped when the current token is
+        still valid for at least min_ttl seconds, unless force is set.
+        """
+        if not force and self._token:
+            with contextlib.suppress(Exception):
+                if self.expire_timestamp - int(time.time()) > min_ttl:
+                    return
         self._token = await self._obtain_token()
+        self._token_exp_for = None
 
     @property
     def expire_timestamp(self) -> int:
         """Return the remaining seconds for the token."""
-        jwt_payload = jwt.decode(self.token, options={"verify_signature": False})
-        return cast(int, jwt_payload["exp"])
-
-    @retry(
-        retry=retry_if_exception_type(
-            (httpx.NetworkError, httpx.TimeoutException, httpx.RemoteProtocolError)
-        ),
-        wait=wait_random_exponential(multiplier=2, max=3),
-    )
-    async def _post_json_with_cloud_client(
-        self,
-        cloud_client: httpx.AsyncClient,
-        url: str,
-        data: dict[str, Any] | None = None,
-        json: dict[str, Any] | None = None,
-    ) -> httpx.Response:
-        """Post to the Envoy API with the cloud client."""
-        return await cloud_client.post(url, json=json, data=data)
+        token = self.token
+        if self._token_exp_for is token and self._token_exp is not None:
+            return self._token_exp
+        self._token_exp = _extract_exp(token)
+        self._token_exp_for = token
+        return self._token_exp
 
     @property
     def token(self) -> str:
-        assert self._token is not None  # nosec
+        if self._token is None:
+            raise EnvoyAuthenticationError(
+                "No token has been obtained for Envoy authentication."
+            )
         return self._token
 
     @property
     def manager_token(self) -> str:
-        assert self._manager_token is not None  # nosec
+        if self._manager_token is None:
+            raise EnvoyAuthenticationError(
+                "No manager token has been obtained from Enlighten."
+            )
         return self._manager_token
 
     @property
-    def cookies(self) -> dict[str, str]:
-        return self._cookies
+    def cookies(self) -> dict[str, str] | httpx.Cookies:
+        return self._cookies or _EMPTY_COOKIES
 
     @property
     def is_consumer(self) -> bool:
@@ -204,41 +394,51 @@ class EnvoyTokenAuth(EnvoyAuth):
     @property
     def headers(self) -> dict[str, str]:
         """Return the headers for Envoy authentication."""
-        return {"Authorization": f"Bearer {self.token}"}
+        token = self.token
+        if self._headers_for_token is not token:
+            self._headers = {"Authorization": f"Bearer {token}"}
+            self._headers_for_token = token
+        return self._headers
 
     def get_endpoint_url(self, endpoint: str) -> str:
         """Return the URL for the endpoint."""
-        return f"https://{self.host}{endpoint}"
+        return self._url_prefix + endpoint
 
 
 class EnvoyLegacyAuth(EnvoyAuth):
     """Class for legacy Envoy authentication."""
 
+    __slots__ = ("host", "local_username", "local_password", "_auth", "_url_prefix")
+
     def __init__(self, host: str, username: str, password: str) -> None:
         self.host = host
         self.local_username = username
         self.local_password = password
+        # A single DigestAuth instance lets httpx reuse the server nonce
+        # instead of redoing the 401 challenge on every request
+        self._auth = (
+            httpx.DigestAuth(username, password) if username and password else None
+        )
+        self._url_prefix = f"http://{host}"
 
     @property
-    def auth(self) -> httpx.DigestAuth:
+    def auth(self) -> httpx.DigestAuth | None:
         """Digest authentication for local Envoy."""
-        if not self.local_username or not self.local_password:
-            return None
-        return httpx.DigestAuth(self.local_username, self.local_password)
+        return self._auth
 
     async def setup(self, client: httpx.AsyncClient) -> None:
         """Setup auth"""
         # No setup required for legacy authentication
 
     @property
-    def headers(self) -> dict[str, str]:
+    def headers(self) -> Mapping[str, str]:
         """Return the headers for legacy Envoy authentication."""
-        return {}
+        return _EMPTY_HEADERS
 
     def get_endpoint_url(self, endpoint: str) -> str:
         """Return the URL for the endpoint."""
-        return f"http://{self.host}{endpoint}"
+        return self._url_prefix + endpoint
 
     @property
-    def cookies(self) -> dict[str, str]:
-        return {}
+    def cookies(self) -> httpx.Cookies:
+        return _EMPTY_COOKIES
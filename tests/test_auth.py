@@ -0,0 +1,101 @@
+import base64
+import time
+
+import orjson
+import pytest
+import respx
+from httpx import Response
+
+from pyenphase.auth import EnvoyTokenAuth
+from pyenphase.exceptions import EnvoyAuthenticationError
+
+LOGIN_RESPONSE = {
+    "session_id": "1234567890",
+    "user_id": "1234567890",
+    "user_name": "test",
+    "first_name": "Test",
+    "is_consumer": True,
+    "manager_token": "1234567890",
+}
+
+
+def _make_jwt(payload: dict) -> str:
+    """Build an unsigned JWT with the given payload."""
+    header = base64.urlsafe_b64encode(orjson.dumps({"alg": "none"})).rstrip(b"=")
+    body = base64.urlsafe_b64encode(orjson.dumps(payload)).rstrip(b"=")
+    return b".".join((header, body, b"")).decode()
+
+
+def test_expire_timestamp():
+    """Verify the exp claim is extracted from the token."""
+    token = _make_jwt({"exp": 1907837780})
+    auth = EnvoyTokenAuth("127.0.0.1", token=token)
+    assert auth.expire_timestamp == 1907837780
+    # Second read hits the cached value
+    assert auth.expire_timestamp == 1907837780
+
+
+@pytest.mark.asyncio
+async def test_refresh_skipped_while_token_is_fresh():
+    """Verify refresh short-circuits when the token is still valid."""
+    token = _make_jwt({"exp": int(time.time()) + 86400})
+    auth = EnvoyTokenAuth("127.0.0.1", token=token)
+    # No cloud credentials, so an actual refresh attempt would raise
+    await auth.refresh()
+    assert auth.token == token
+    with pytest.raises(EnvoyAuthenticationError):
+        await auth.refresh(force=True)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_refresh_reuses_cached_session_id():
+    """Verify a fresh Enlighten session skips the login round-trip."""
+    login_route = respx.post(EnvoyTokenAuth.JSON_LOGIN_URL).mock(
+        return_value=Response(200, json=LOGIN_RESPONSE)
+    )
+    token_route = respx.post(EnvoyTokenAuth.TOKEN_URL).mock(
+        return_value=Response(200, text="token")
+    )
+    auth = EnvoyTokenAuth(
+        "127.0.0.1",
+        cloud_username="username",
+        cloud_password="password",
+        envoy_serial="123456789012",
+    )
+    await auth.refresh(force=True)
+    assert login_route.call_count == 1
+    assert token_route.call_count == 1
+
+    await auth.refresh(force=True)
+    assert login_route.call_count == 1
+    assert token_route.call_count == 2
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_rejected_cached_session_id_relogins_once():
+    """Verify a rejected cached session triggers exactly one re-login."""
+    login_route = respx.post(EnvoyTokenAuth.JSON_LOGIN_URL).mock(
+        return_value=Response(200, json=LOGIN_RESPONSE)
+    )
+    token_route = respx.post(EnvoyTokenAuth.TOKEN_URL).mock(
+        side_effect=[
+            Response(200, text="token"),
+            Response(401),
+            Response(401),
+        ]
+    )
+    auth = EnvoyTokenAuth(
+        "127.0.0.1",
+        cloud_username="username",
+        cloud_password="password",
+        envoy_serial="123456789012",
+    )
+    await auth.refresh(force=True)
+    assert auth.token == "token"
+
+    with pytest.raises(EnvoyAuthenticationError):
+        await auth.refresh(force=True)
+    assert login_route.call_count == 2
+    assert token_route.call_count == 3